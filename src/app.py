@@ -13,9 +13,13 @@ from utils.database import (
     get_user_threads, delete_thread, create_session, 
     get_user_from_session, delete_session, get_username
 )
+from utils.usage import is_over_quota
+from utils.maintenance import start_maintenance
+from utils.history_cache import get_history, prefetch_histories, invalidate_history
 
 # Initialize Database
 init_db()
+start_maintenance()
 
 # Page Config
 st.set_page_config(
@@ -42,6 +46,9 @@ if 'thread_id' not in st.session_state:
 if 'message_history' not in st.session_state:
     st.session_state['message_history'] = []
 
+if 'prefetched' not in st.session_state:
+    st.session_state['prefetched'] = False
+
 # Session Persistence Check
 if st.session_state['user'] is None:
     # Check for session token in query params
@@ -144,14 +151,19 @@ def reset_chat():
     st.session_state['message_history'] = []
     st.rerun()
 
-def load_conversation(thread_id):
+def fetch_conversation(thread_id):
     state = chatbot.get_state(config={'configurable': {'thread_id': thread_id}})
+    checkpoint_id = state.config.get('configurable', {}).get('checkpoint_id')
     messages = state.values.get('messages', [])
     formatted_messages = []
     for msg in messages:
         role = 'user' if isinstance(msg, HumanMessage) else 'assistant'
         formatted_messages.append({'role': role, 'content': msg.content})
-    return formatted_messages
+    return checkpoint_id, formatted_messages
+
+def load_conversation(thread_id):
+    # Served from the in-process cache unless the thread has a newer checkpoint
+    return get_history(thread_id, fetch_conversation)
 
 # Main App Logic
 if st.session_state['user'] is None:
@@ -180,6 +192,11 @@ else:
         st.markdown("### CHAT HISTORY")
         threads = get_user_threads(user_id)
         
+        # Warm the history cache for the most recent threads once per login
+        if not st.session_state['prefetched']:
+            prefetch_histories(threads, fetch_conversation)
+            st.session_state['prefetched'] = True
+        
         # If no thread selected yet, select the most recent one or create new
         if st.session_state['thread_id'] is None:
             if threads:
@@ -215,6 +232,7 @@ else:
             st.session_state['user'] = None
             st.session_state['thread_id'] = None
             st.session_state['message_history'] = []
+            st.session_state['prefetched'] = False
             st.rerun()
 
     # Chat Area
@@ -228,7 +246,9 @@ else:
         with st.chat_message(message['role']):
             st.markdown(message['content'])
     
-    if user_input:
+    if user_input and is_over_quota(user_id):
+        st.error("DAILY TOKEN QUOTA EXCEEDED. TRY AGAIN TOMORROW.")
+    elif user_input:
         # Add user message to history
         st.session_state['message_history'].append({'role': 'user', 'content': user_input})
         # Display user message
@@ -260,3 +280,5 @@ else:
             
         # Add assistant response to history after streaming is complete
         st.session_state['message_history'].append({'role': 'assistant', 'content': full_response})
+        # The turn wrote new checkpoints, so the cached history is stale
+        invalidate_history(st.session_state["thread_id"])
@@ -1,12 +1,17 @@
 from langgraph.graph import StateGraph, START, END
 from typing import TypedDict, Annotated
 from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph.message import add_messages
 from dotenv import load_dotenv
 import sqlite3
 import os
+import time
+
+from utils.database import JOURNAL_SIZE_LIMIT
+from utils.usage import record_usage
 
 load_dotenv()
 
@@ -17,21 +22,32 @@ DB_PATH = os.path.join(BASE_DIR, 'chatbot.db')
 llm = ChatOpenAI(
     model="gpt-4o-mini",            
     api_key=os.getenv("OPENROUTER_API_KEY"),
-    base_url="https://openrouter.ai/api/v1"
+    base_url="https://openrouter.ai/api/v1",
+    # Ask for token counts on streamed responses too, so usage can be recorded
+    stream_usage=True
 )
 
 class ChatState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
 
-def chat_node(state: ChatState):
+def chat_node(state: ChatState, config: RunnableConfig):
     messages = state['messages']
+    start = time.perf_counter()
     response = llm.invoke(messages)
+    latency_ms = (time.perf_counter() - start) * 1000
+
+    # Usage is buffered in memory and flushed to SQLite in batches
+    usage = getattr(response, 'usage_metadata', None) or {}
+    user_id = config.get('metadata', {}).get('user_id')
+    record_usage(user_id, usage.get('input_tokens', 0), usage.get('output_tokens', 0), latency_ms)
     return {"messages": [response]}
 
 # We need to ensure the connection is created when needed or globally if safe
 # SqliteSaver needs a connection. 
 # We'll create a connection here. Note: check_same_thread=False is needed for Streamlit.
 conn = sqlite3.connect(database=DB_PATH, check_same_thread=False)
+# Most writes go through this connection, so cap the WAL here as well
+conn.execute(f'PRAGMA journal_size_limit={JOURNAL_SIZE_LIMIT}')
 checkpointer = SqliteSaver(conn=conn)
 
 graph = StateGraph(ChatState)
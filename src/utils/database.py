@@ -9,10 +9,18 @@ from datetime import datetime
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 DB_PATH = os.path.join(BASE_DIR, 'chatbot.db')
 
+# Size (in bytes) the -wal file is cut back to whenever SQLite restarts it,
+# otherwise it stays at its largest size forever
+JOURNAL_SIZE_LIMIT = int(os.getenv("JOURNAL_SIZE_LIMIT", str(4 * 1024 * 1024)))
+
 def get_connection():
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    # Must come before journal_mode so a brand new database file is created with
+    # incremental vacuum enabled (no-op for existing files, see utils.maintenance)
+    conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
     # Ensure we can see all committed changes immediately (important for WAL mode)
     conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA journal_size_limit={JOURNAL_SIZE_LIMIT}')
     return conn
 
 def init_db():
@@ -50,6 +58,21 @@ def init_db():
         )
     ''')
     
+    # Create token_usage table - one row per user per day, written in batches by utils.usage
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS token_usage (
+            user_id INTEGER,
+            day TEXT,
+            prompt_tokens INTEGER DEFAULT 0,
+            completion_tokens INTEGER DEFAULT 0,
+            requests INTEGER DEFAULT 0,
+            total_latency_ms REAL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, day),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
     conn.commit()
     conn.close()
 
@@ -0,0 +1,110 @@
+import os
+import threading
+from collections import OrderedDict
+
+from utils.database import get_connection
+
+# Upper bounds for the in-process cache of formatted conversation histories
+HISTORY_CACHE_MAX_THREADS = int(os.getenv("HISTORY_CACHE_MAX_THREADS", "64"))
+HISTORY_CACHE_MAX_BYTES = int(os.getenv("HISTORY_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# How many of a user's most recent threads are loaded in the background after login
+PREFETCH_THREADS = int(os.getenv("PREFETCH_THREADS", "5"))
+
+# Rough per-message overhead (dict, role string) added to the content length
+_MESSAGE_OVERHEAD = 200
+
+_lock = threading.Lock()
+# thread_id -> (checkpoint_id, messages, size), least recently used first
+_cache = OrderedDict()
+_total_bytes = 0
+
+
+def _estimate_size(messages):
+    return sum(len(str(m['content'])) + _MESSAGE_OVERHEAD for m in messages)
+
+
+def get_latest_checkpoint_id(thread_id):
+    """
+    Id of the newest checkpoint for a thread, read straight from the LangGraph
+    checkpoints table (primary key lookup, nothing is deserialized).
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        c.execute('''
+            SELECT checkpoint_id FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_ns = ''
+            ORDER BY checkpoint_id DESC LIMIT 1
+        ''', (str(thread_id),))
+        result = c.fetchone()
+        return result[0] if result else None
+    except Exception:
+        # checkpoints table is created lazily by LangGraph on first use
+        return None
+    finally:
+        conn.close()
+
+
+def get_cached_history(thread_id, checkpoint_id):
+    """Cached history for the thread if it is still at checkpoint_id, else None"""
+    with _lock:
+        entry = _cache.get(thread_id)
+        if entry is None or entry[0] != checkpoint_id:
+            return None
+        _cache.move_to_end(thread_id)
+        # Callers append to the returned list, so never hand out the cached one
+        return list(entry[1])
+
+
+def cache_history(thread_id, checkpoint_id, messages):
+    global _total_bytes
+    size = _estimate_size(messages)
+    if size > HISTORY_CACHE_MAX_BYTES:
+        invalidate_history(thread_id)
+        return
+    with _lock:
+        old = _cache.pop(thread_id, None)
+        if old is not None:
+            _total_bytes -= old[2]
+        _cache[thread_id] = (checkpoint_id, list(messages), size)
+        _total_bytes += size
+        while len(_cache) > HISTORY_CACHE_MAX_THREADS or _total_bytes > HISTORY_CACHE_MAX_BYTES:
+            _, evicted = _cache.popitem(last=False)
+            _total_bytes -= evicted[2]
+
+
+def invalidate_history(thread_id):
+    global _total_bytes
+    with _lock:
+        old = _cache.pop(thread_id, None)
+        if old is not None:
+            _total_bytes -= old[2]
+
+
+def get_history(thread_id, loader):
+    """
+    Formatted history for a thread, from the cache when the thread has no newer
+    checkpoint. loader(thread_id) must return (checkpoint_id, messages).
+    """
+    cached = get_cached_history(thread_id, get_latest_checkpoint_id(thread_id))
+    if cached is not None:
+        return cached
+    checkpoint_id, messages = loader(thread_id)
+    cache_history(thread_id, checkpoint_id, messages)
+    return list(messages)
+
+
+def _prefetch(thread_ids, loader):
+    for thread_id in thread_ids:
+        try:
+            get_history(thread_id, loader)
+        except Exception as e:
+            print(f"Error prefetching thread {thread_id}: {e}")
+
+
+def prefetch_histories(thread_ids, loader):
+    """Warm the cache for the given threads on a background thread"""
+    thread_ids = list(thread_ids)[:PREFETCH_THREADS]
+    if not thread_ids:
+        return
+    threading.Thread(target=_prefetch, args=(thread_ids, loader), name="history-prefetch", daemon=True).start()
@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+
+from utils.database import DB_PATH, get_connection
+
+# How often (in seconds) the background maintenance pass runs
+MAINTENANCE_INTERVAL = int(os.getenv("MAINTENANCE_INTERVAL", "300"))
+# WAL size (in MB) above which a PASSIVE / TRUNCATE checkpoint is issued
+WAL_PASSIVE_THRESHOLD_MB = float(os.getenv("WAL_PASSIVE_THRESHOLD_MB", "4"))
+WAL_TRUNCATE_THRESHOLD_MB = float(os.getenv("WAL_TRUNCATE_THRESHOLD_MB", "64"))
+# Maximum number of free pages released by a single incremental_vacuum step
+VACUUM_MAX_PAGES = int(os.getenv("VACUUM_MAX_PAGES", "500"))
+# How often (in seconds) PRAGMA optimize refreshes query planner statistics
+OPTIMIZE_INTERVAL = int(os.getenv("OPTIMIZE_INTERVAL", "3600"))
+
+AUTO_VACUUM_MODES = {0: 'NONE', 1: 'FULL', 2: 'INCREMENTAL'}
+
+_lock = threading.Lock()
+_maintenance_thread = None
+_last_optimize = 0.0
+
+
+def get_wal_size():
+    """Size of the -wal file in bytes (0 if it does not exist)"""
+    wal_path = DB_PATH + '-wal'
+    return os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+
+
+def get_storage_stats(conn=None):
+    """Page, freelist and WAL figures used by the maintenance pass and the CLI report"""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        freelist_count = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    finally:
+        if own_conn:
+            conn.close()
+
+    return {
+        'page_size': page_size,
+        'page_count': page_count,
+        'freelist_count': freelist_count,
+        'fragmentation': freelist_count / page_count if page_count else 0.0,
+        'reclaimable_bytes': freelist_count * page_size,
+        'auto_vacuum': AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum)),
+        'journal_mode': journal_mode,
+        'db_size': os.path.getsize(DB_PATH) if os.path.exists(DB_PATH) else 0,
+        'wal_size': get_wal_size(),
+    }
+
+
+def checkpoint_wal(mode='PASSIVE', conn=None):
+    """Run a WAL checkpoint. Returns (busy, wal_frames, checkpointed_frames)."""
+    mode = mode.upper()
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        raise ValueError(f"Unknown checkpoint mode: {mode}")
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        return tuple(conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone())
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def maybe_checkpoint(conn=None, force=False):
+    """
+    Checkpoint the WAL when it has grown past the configured thresholds (or when
+    forced, e.g. after a vacuum). A PASSIVE checkpoint that copied every frame is
+    followed by a TRUNCATE so the -wal file size keeps reflecting un-checkpointed data.
+    """
+    wal_mb = get_wal_size() / (1024 * 1024)
+    if wal_mb >= WAL_TRUNCATE_THRESHOLD_MB:
+        return 'TRUNCATE', checkpoint_wal('TRUNCATE', conn)
+    if wal_mb >= WAL_PASSIVE_THRESHOLD_MB or (force and wal_mb > 0):
+        busy, wal_frames, checkpointed = checkpoint_wal('PASSIVE', conn)
+        if not busy and wal_frames > 0 and checkpointed == wal_frames:
+            checkpoint_wal('TRUNCATE', conn)
+            return 'PASSIVE+TRUNCATE', (busy, wal_frames, checkpointed)
+        return 'PASSIVE', (busy, wal_frames, checkpointed)
+    return None, None
+
+
+def enable_incremental_vacuum(conn=None):
+    """
+    Switch the database to auto_vacuum=INCREMENTAL.
+    New databases get this from init_db; existing ones need a full VACUUM to
+    convert, which rewrites the whole file, so it is never run automatically.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return False
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('VACUUM')
+        return True
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def incremental_vacuum(max_pages=None, conn=None):
+    """Release up to max_pages free pages back to the filesystem. Returns pages freed."""
+    if max_pages is None:
+        max_pages = VACUUM_MAX_PAGES
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            return 0
+        before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if before == 0:
+            return 0
+        # executescript steps the pragma to completion; execute() would only free one page
+        conn.executescript(f'PRAGMA incremental_vacuum({int(max_pages)});')
+        after = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        return before - after
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def optimize(full_analyze=False, conn=None):
+    """Refresh query planner statistics. PRAGMA optimize only re-analyzes tables that need it."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        if full_analyze:
+            conn.execute('ANALYZE')
+        conn.execute('PRAGMA optimize')
+        conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def run_maintenance(force_optimize=False):
+    """One maintenance pass: reclaim free pages, optimize periodically, then checkpoint if needed"""
+    global _last_optimize
+    with _lock:
+        conn = get_connection()
+        try:
+            freed = incremental_vacuum(conn=conn)
+            optimized = False
+            if force_optimize or time.time() - _last_optimize >= OPTIMIZE_INTERVAL:
+                optimize(full_analyze=force_optimize, conn=conn)
+                _last_optimize = time.time()
+                optimized = True
+            # Checkpoint last so vacuumed pages are folded back into the main file
+            # (shrinking it) in the same pass
+            mode, result = maybe_checkpoint(conn, force=freed > 0)
+            return {'checkpoint': mode, 'checkpoint_result': result, 'pages_freed': freed, 'optimized': optimized}
+        finally:
+            conn.close()
+
+
+def _maintenance_loop():
+    while True:
+        time.sleep(MAINTENANCE_INTERVAL)
+        try:
+            run_maintenance()
+        except Exception as e:
+            print(f"Error during database maintenance: {e}")
+
+
+def start_maintenance():
+    """Start the background maintenance thread (safe to call on every Streamlit rerun)"""
+    global _maintenance_thread
+    with _lock:
+        if _maintenance_thread is not None:
+            return
+        _maintenance_thread = threading.Thread(target=_maintenance_loop, name="db-maintenance", daemon=True)
+        _maintenance_thread.start()
@@ -0,0 +1,167 @@
+import atexit
+import os
+import threading
+from datetime import date
+
+from utils.database import get_connection
+
+# How often (in seconds) buffered usage is written to SQLite, and how many
+# pending user/day buckets force an early flush
+FLUSH_INTERVAL = int(os.getenv("USAGE_FLUSH_INTERVAL", "30"))
+FLUSH_THRESHOLD = int(os.getenv("USAGE_FLUSH_THRESHOLD", "100"))
+
+# Daily token allowance per user (prompt + completion). 0 disables the quota.
+DAILY_TOKEN_QUOTA = int(os.getenv("DAILY_TOKEN_QUOTA", "0"))
+
+_lock = threading.Lock()
+# (user_id, day) -> running totals for today, used for quota checks
+_totals = {}
+# (user_id, day) -> deltas not yet written to the database
+_pending = {}
+_loaded_day = None
+_flush_event = threading.Event()
+_flush_thread = None
+
+
+def _empty_bucket():
+    return {'prompt_tokens': 0, 'completion_tokens': 0, 'requests': 0, 'latency_ms': 0.0}
+
+
+def _load_totals(day):
+    """Seed the in-memory totals with what is already stored for the given day"""
+    conn = get_connection()
+    c = conn.cursor()
+    try:
+        c.execute('''
+            SELECT user_id, prompt_tokens, completion_tokens, requests, total_latency_ms
+            FROM token_usage WHERE day = ?
+        ''', (day,))
+        rows = c.fetchall()
+    except Exception as e:
+        print(f"Error loading token usage: {e}")
+        rows = []
+    finally:
+        conn.close()
+
+    for user_id, prompt_tokens, completion_tokens, requests, latency_ms in rows:
+        _totals[(user_id, day)] = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'requests': requests,
+            'latency_ms': latency_ms,
+        }
+
+
+def _ensure_day(day):
+    # Must be called with _lock held. Totals are only kept for the current day,
+    # so older buckets are dropped once they have been flushed.
+    global _loaded_day
+    if _loaded_day == day:
+        return
+    for key in [k for k in _totals if k[1] != day and k not in _pending]:
+        del _totals[key]
+    _load_totals(day)
+    _loaded_day = day
+
+
+def _start_flusher():
+    global _flush_thread
+    if _flush_thread is not None:
+        return
+    _flush_thread = threading.Thread(target=_flush_loop, name="usage-flusher", daemon=True)
+    _flush_thread.start()
+
+
+def _flush_loop():
+    while True:
+        _flush_event.wait(FLUSH_INTERVAL)
+        _flush_event.clear()
+        try:
+            flush_usage()
+        except Exception as e:
+            print(f"Error in usage flusher: {e}")
+
+
+def record_usage(user_id, prompt_tokens, completion_tokens, latency_ms):
+    """Record one LLM call in memory. Written to the database by the next flush."""
+    if user_id is None:
+        return
+    day = date.today().isoformat()
+    key = (user_id, day)
+    with _lock:
+        _ensure_day(day)
+        for bucket in (_totals.setdefault(key, _empty_bucket()), _pending.setdefault(key, _empty_bucket())):
+            bucket['prompt_tokens'] += prompt_tokens or 0
+            bucket['completion_tokens'] += completion_tokens or 0
+            bucket['requests'] += 1
+            bucket['latency_ms'] += latency_ms or 0.0
+        should_flush = len(_pending) >= FLUSH_THRESHOLD
+    _start_flusher()
+    if should_flush:
+        _flush_event.set()
+
+
+def flush_usage():
+    """Write all buffered usage to the token_usage table in a single transaction"""
+    with _lock:
+        if not _pending:
+            return 0
+        batch = dict(_pending)
+        _pending.clear()
+
+    conn = None
+    try:
+        conn = get_connection()
+        c = conn.cursor()
+        c.executemany('''
+            INSERT INTO token_usage (user_id, day, prompt_tokens, completion_tokens, requests, total_latency_ms)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, day) DO UPDATE SET
+                prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                completion_tokens = completion_tokens + excluded.completion_tokens,
+                requests = requests + excluded.requests,
+                total_latency_ms = total_latency_ms + excluded.total_latency_ms,
+                updated_at = CURRENT_TIMESTAMP
+        ''', [
+            (user_id, day, b['prompt_tokens'], b['completion_tokens'], b['requests'], b['latency_ms'])
+            for (user_id, day), b in batch.items()
+        ])
+        conn.commit()
+        return len(batch)
+    except Exception as e:
+        print(f"Error flushing token usage: {e}")
+        # Put the batch back so it is retried on the next flush
+        with _lock:
+            for key, b in batch.items():
+                pending = _pending.setdefault(key, _empty_bucket())
+                for field, value in b.items():
+                    pending[field] += value
+        return 0
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def get_daily_usage(user_id):
+    """Today's usage for a user, served from memory"""
+    day = date.today().isoformat()
+    with _lock:
+        _ensure_day(day)
+        return dict(_totals.get((user_id, day), _empty_bucket()))
+
+
+def get_remaining_tokens(user_id):
+    """Tokens left in today's quota, or None when no quota is configured"""
+    if DAILY_TOKEN_QUOTA <= 0:
+        return None
+    usage = get_daily_usage(user_id)
+    used = usage['prompt_tokens'] + usage['completion_tokens']
+    return max(DAILY_TOKEN_QUOTA - used, 0)
+
+
+def is_over_quota(user_id):
+    remaining = get_remaining_tokens(user_id)
+    return remaining is not None and remaining <= 0
+
+
+atexit.register(flush_usage)
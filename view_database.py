@@ -5,11 +5,15 @@ Run this script to see all registered users and other database information
 
 Usage:
     python view_database.py
+    python view_database.py --maintenance           # WAL / freelist / fragmentation report
+    python view_database.py --maintenance --run     # also checkpoint, vacuum and optimize now
+    python view_database.py --maintenance --convert # switch an existing database to incremental vacuum
 
 This will display:
 - All registered users (usernames, IDs, registration dates)
 - Active login sessions
 - Chat threads per user
+- Token usage per user
 - Database statistics
 """
 
@@ -21,6 +25,50 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from utils.database import DB_PATH, get_connection
+from utils.maintenance import (
+    get_storage_stats, run_maintenance, enable_incremental_vacuum,
+    WAL_PASSIVE_THRESHOLD_MB, WAL_TRUNCATE_THRESHOLD_MB
+)
+
+def print_usage_report(c):
+    print("\n" + "=" * 60)
+    print("TOKEN USAGE SUMMARY")
+    print("=" * 60)
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='token_usage'")
+    if not c.fetchone():
+        print("(No usage recorded yet)")
+        return
+    
+    c.execute("""
+        SELECT tu.user_id, u.username, SUM(tu.prompt_tokens), SUM(tu.completion_tokens),
+               SUM(tu.requests), SUM(tu.total_latency_ms)
+        FROM token_usage tu
+        LEFT JOIN users u ON tu.user_id = u.id
+        GROUP BY tu.user_id, u.username
+        ORDER BY SUM(tu.prompt_tokens + tu.completion_tokens) DESC
+    """)
+    totals = c.fetchall()
+    if not totals:
+        print("(No usage recorded yet)")
+        return
+    
+    print("Totals per User:")
+    for user_id, username, prompt, completion, requests, latency_ms in totals:
+        avg_latency = latency_ms / requests if requests else 0
+        print(f"  - {username} (ID: {user_id}): {prompt + completion} tokens "
+              f"(prompt: {prompt}, completion: {completion}) | "
+              f"Requests: {requests} | Avg Latency: {avg_latency:.0f} ms")
+    
+    c.execute("""
+        SELECT tu.day, u.username, tu.prompt_tokens, tu.completion_tokens, tu.requests
+        FROM token_usage tu
+        LEFT JOIN users u ON tu.user_id = u.id
+        ORDER BY tu.day DESC, tu.prompt_tokens + tu.completion_tokens DESC
+        LIMIT 30
+    """)
+    print("\nRecent Daily Usage:")
+    for day, username, prompt, completion, requests in c.fetchall():
+        print(f"  - {day} | {username}: {prompt + completion} tokens in {requests} request(s)")
 
 def view_database():
     print("=" * 60)
@@ -152,6 +200,9 @@ def view_database():
             for user_id, username, count in user_threads:
                 print(f"  - {username} (ID: {user_id}): {count} thread(s)")
         
+        # Token usage summary
+        print_usage_report(c)
+        
     except Exception as e:
         print(f"ERROR: {e}")
     finally:
@@ -161,6 +212,56 @@ def view_database():
     print("View complete!")
     print("=" * 60)
 
+def print_storage_stats(stats):
+    print(f"Journal Mode: {stats['journal_mode']}")
+    print(f"Auto Vacuum: {stats['auto_vacuum']}")
+    print(f"Database Size: {stats['db_size'] / 1024:.2f} KB")
+    print(f"WAL Size: {stats['wal_size'] / 1024:.2f} KB "
+          f"(passive checkpoint at {WAL_PASSIVE_THRESHOLD_MB} MB, truncate at {WAL_TRUNCATE_THRESHOLD_MB} MB)")
+    print(f"Pages: {stats['page_count']} x {stats['page_size']} bytes")
+    print(f"Freelist Pages: {stats['freelist_count']} ({stats['reclaimable_bytes'] / 1024:.2f} KB reclaimable)")
+    print(f"Fragmentation: {stats['fragmentation'] * 100:.1f}%")
+
+def view_maintenance(run=False, convert=False):
+    print("=" * 60)
+    print("NEXUS AI - DATABASE MAINTENANCE")
+    print("=" * 60)
+    
+    if not os.path.exists(DB_PATH):
+        print(f"ERROR: Database file not found at: {DB_PATH}")
+        return
+    
+    print(f"\nDatabase Location: {DB_PATH}\n")
+    print_storage_stats(get_storage_stats())
+    
+    if convert:
+        print("\nEnabling incremental vacuum (full VACUUM, this may take a while)...")
+        if enable_incremental_vacuum():
+            print("Database converted to auto_vacuum=INCREMENTAL.")
+        else:
+            print("Incremental vacuum already enabled.")
+    
+    if run:
+        print("\nRunning maintenance pass...")
+        result = run_maintenance(force_optimize=True)
+        if result['checkpoint']:
+            busy, wal_frames, checkpointed = result['checkpoint_result']
+            print(f"  - Checkpoint ({result['checkpoint']}): {checkpointed}/{wal_frames} frames"
+                  f"{' (busy)' if busy else ''}")
+        else:
+            print("  - Checkpoint: skipped (WAL below threshold)")
+        print(f"  - Pages Freed: {result['pages_freed']}")
+        print(f"  - Statistics Optimized: {'yes' if result['optimized'] else 'no'}")
+    
+    if run or convert:
+        print("\nAfter maintenance:\n")
+        print_storage_stats(get_storage_stats())
+    
+    print("\n" + "=" * 60)
+
 if __name__ == "__main__":
-    view_database()
+    if "--maintenance" in sys.argv:
+        view_maintenance(run="--run" in sys.argv, convert="--convert" in sys.argv)
+    else:
+        view_database()
 